@@ -1,10 +1,11 @@
+import argparse
 import os
-import sys
 from typing import TypedDict
 
 from rich.progress import track
 
 from binary import BinaryReader, BinaryWriter
+from layout import align_offset, order_files, read_order
 
 
 class File(TypedDict):
@@ -16,25 +17,30 @@ def split_array(array: list[File], size: int) -> list[list[File]]:
     return [array[i : i + size] for i in range(0, len(array), size)]
 
 
-def pack_fga(files: list[File]) -> BinaryWriter:
+def pack_fga(files: list[File], alignment: int = 1) -> BinaryWriter:
+    if alignment < 1:
+        raise ValueError(f"Invalid alignment {alignment}")
     fga = BinaryWriter()
     offset = 0x318
     splited_files = split_array(files, 32)
     for grouped_files_index, grouped_files in track(
         enumerate(splited_files), description="Packing files", total=len(splited_files)
     ):
+        offsets = []
         for file in grouped_files:
+            offset = align_offset(offset, alignment)
+            offsets.append(offset)
+            offset += len(file["data"].data)
+        for file, file_offset in zip(grouped_files, offsets):
             name = file["name"].encode("shift-jis")
             if len(name) > 12:
                 raise ValueError(f"File name {file['name']} is too long")
             fga.write_bytes(name)
             if len(name) < 12:
                 fga.write_bytes(b"\0" * (12 - len(name)))
-            data_len = len(file["data"].data)
-            fga.write_unsigned_int_32_le(offset)
-            fga.write_unsigned_int_32_le(data_len)
+            fga.write_unsigned_int_32_le(file_offset)
+            fga.write_unsigned_int_32_le(len(file["data"].data))
             fga.write_bytes(b"\0" * 4)
-            offset += data_len
         if len(grouped_files) < 32:
             for _ in range(32 - len(grouped_files)):
                 fga.write_bytes(b"\x00" * 12)
@@ -51,7 +57,8 @@ def pack_fga(files: list[File]) -> BinaryWriter:
             fga.write_unsigned_int_32_le(offset)
             fga.write_unsigned_int_32_le(0)
             fga.write_bytes(b"\0" * 4)
-        for file in grouped_files:
+        for file, file_offset in zip(grouped_files, offsets):
+            fga.write_bytes(b"\0" * (file_offset - len(fga.data)))
             fga.write_bytes(file["data"].data)
         offset += 0x318
     return fga
@@ -67,21 +74,37 @@ def make_bmp_to_ebp(file: BinaryReader) -> BinaryWriter:
     return ebp
 
 
-def pack_ebp(folder_path: str) -> BinaryWriter:
+def pack_ebp(
+    folder_path: str, order: list[str] | None = None, alignment: int = 1
+) -> BinaryWriter:
     files = []
     print("This may take a while, please wait...")
-    for file in track(os.listdir(folder_path), description="Reading files"):
+    for file in track(sorted(os.listdir(folder_path)), description="Reading files"):
         if file.endswith(".EBP.bmp"):
             file_name = file[:-4]
             with open(os.path.join(folder_path, file), "rb") as f:
                 files.append(
                     {"name": file_name, "data": make_bmp_to_ebp(BinaryReader(f.read()))}
                 )
-    return pack_fga(files)
+    if order:
+        files = order_files(files, order)
+    return pack_fga(files, alignment)
 
 
 if __name__ == "__main__":
-    ebp = pack_ebp(sys.argv[1])
+    parser = argparse.ArgumentParser()
+    parser.add_argument("folder")
+    parser.add_argument(
+        "--order", help="Load-order trace or manifest, one entry name per line"
+    )
+    parser.add_argument(
+        "--align", type=int, default=1, help="Align entry payloads to N bytes"
+    )
+    args = parser.parse_args()
+    if args.align < 1:
+        parser.error("--align must be at least 1")
+    order = read_order(args.order) if args.order else None
+    ebp = pack_ebp(args.folder, order, args.align)
     with open("packed_ebp.fga", "wb") as f:
         f.write(ebp.bytes)
     print("Done! Your packed EBP is saved as packed_ebp.fga")
@@ -0,0 +1,238 @@
+import argparse
+import hashlib
+import os
+import stat
+import tempfile
+import zlib
+from typing import TypedDict
+
+from rich.progress import track
+
+from binary import BinaryReader, BinaryWriter
+
+PATCH_MAGIC = b"FGAPATCH"
+PATCH_VERSION = 1
+
+OP_COPY = 0
+OP_DATA = 1
+
+COPY_CHUNK_SIZE = 0x100000
+
+
+class FileMetadata(TypedDict):
+    name: str
+    offset: int
+    size: int
+
+
+class Op(TypedDict):
+    kind: int
+    start: int
+    size: int
+
+
+def read_metadata_table(data: bytes) -> list[FileMetadata]:
+    reader = BinaryReader(data)
+    tables: list[FileMetadata] = []
+    visited = set()
+    table_offset = 0
+    while table_offset not in visited and table_offset + 0x318 <= len(data):
+        visited.add(table_offset)
+        reader.goto(table_offset)
+        header_reader = reader.read_bytes_into_reader(0x318)
+        table_offset = 0
+        while not header_reader.eof:
+            name = header_reader.read_bytes(12)
+            offset = header_reader.read_unsigned_int_32_le()
+            size = header_reader.read_unsigned_int_32_le()
+            header_reader.skip(4)
+            if name == b"\xff" * 12:
+                table_offset = offset
+                break
+            if offset == 0 and size == 0:
+                return tables
+            c_name = name.rstrip(b"\0").decode("shift-jis")
+            tables.append({"name": c_name, "offset": offset, "size": size})
+    return tables
+
+
+def payload_hash(data: bytes, entry: FileMetadata) -> bytes:
+    return hashlib.sha256(
+        data[entry["offset"] : entry["offset"] + entry["size"]]
+    ).digest()
+
+
+def diff_fga(old: bytes, new: bytes) -> BinaryWriter:
+    old_metadata = read_metadata_table(old)
+    new_metadata = read_metadata_table(new)
+
+    old_payloads = {}
+    old_hashes = {}
+    for entry in old_metadata:
+        digest = payload_hash(old, entry)
+        old_payloads.setdefault(digest, entry["offset"])
+        old_hashes[entry["name"]] = digest
+
+    ops: list[Op] = []
+    cursor = 0
+    added, changed = 0, 0
+    for entry in track(
+        sorted(new_metadata, key=lambda entry: entry["offset"]),
+        description="Comparing entries",
+    ):
+        digest = payload_hash(new, entry)
+        if entry["name"] not in old_hashes:
+            added += 1
+        elif old_hashes[entry["name"]] != digest:
+            changed += 1
+        if digest not in old_payloads or entry["offset"] < cursor:
+            continue
+        if entry["offset"] > cursor:
+            ops.append(
+                {"kind": OP_DATA, "start": cursor, "size": entry["offset"] - cursor}
+            )
+        source = old_payloads[digest]
+        previous = ops[-1] if ops else None
+        if (
+            previous is not None
+            and previous["kind"] == OP_COPY
+            and previous["start"] + previous["size"] == source
+        ):
+            previous["size"] += entry["size"]
+        else:
+            ops.append({"kind": OP_COPY, "start": source, "size": entry["size"]})
+        cursor = entry["offset"] + entry["size"]
+    if cursor < len(new):
+        ops.append({"kind": OP_DATA, "start": cursor, "size": len(new) - cursor})
+
+    new_names = {entry["name"] for entry in new_metadata}
+    removed = sum(1 for name in old_hashes if name not in new_names)
+    print(f"{added} added, {changed} changed, {removed} removed")
+
+    patch = BinaryWriter()
+    patch.write_bytes(PATCH_MAGIC)
+    patch.write_unsigned_int_32_le(PATCH_VERSION)
+    patch.write_unsigned_int_32_le(len(old))
+    patch.write_unsigned_int_32_le(len(new))
+    patch.write_bytes(hashlib.sha256(new).digest())
+    patch.write_unsigned_int_32_le(len(ops))
+    for op in ops:
+        patch.write_byte(op["kind"])
+        if op["kind"] == OP_COPY:
+            chunk = old[op["start"] : op["start"] + op["size"]]
+            patch.write_unsigned_int_32_le(op["start"])
+            patch.write_unsigned_int_32_le(op["size"])
+            patch.write_bytes(hashlib.sha256(chunk).digest())
+        else:
+            compressed = zlib.compress(new[op["start"] : op["start"] + op["size"]], 9)
+            patch.write_unsigned_int_32_le(op["size"])
+            patch.write_unsigned_int_32_le(len(compressed))
+            patch.write_bytes(compressed)
+    return patch
+
+
+def require_patch_bytes(reader: BinaryReader, size: int):
+    if reader.pos + size > len(reader.data):
+        raise ValueError("Corrupted patch data")
+
+
+def apply_fga(old_path: str, patch: bytes, output_path: str):
+    reader = BinaryReader(patch)
+    require_patch_bytes(reader, len(PATCH_MAGIC) + 48)
+    if reader.read_bytes(len(PATCH_MAGIC)) != PATCH_MAGIC:
+        raise ValueError("Not an FGA patch")
+    version = reader.read_unsigned_int_32_le()
+    if version != PATCH_VERSION:
+        raise ValueError(f"Unsupported patch version {version}")
+    old_size = reader.read_unsigned_int_32_le()
+    new_size = reader.read_unsigned_int_32_le()
+    new_hash = reader.read_bytes(32)
+    op_count = reader.read_unsigned_int_32_le()
+
+    if os.path.getsize(old_path) != old_size:
+        raise ValueError("Patch does not match the original archive")
+
+    fd, temp_path = tempfile.mkstemp(
+        prefix=".fga_patch-", dir=os.path.dirname(os.path.abspath(output_path))
+    )
+    try:
+        written = 0
+        output_hash = hashlib.sha256()
+        with open(old_path, "rb") as old, os.fdopen(fd, "wb") as output:
+            for _ in track(range(op_count), description="Applying patch"):
+                require_patch_bytes(reader, 1)
+                kind = reader.read_byte()
+                if kind == OP_COPY:
+                    require_patch_bytes(reader, 40)
+                    start = reader.read_unsigned_int_32_le()
+                    size = reader.read_unsigned_int_32_le()
+                    expected = reader.read_bytes(32)
+                    chunk_hash = hashlib.sha256()
+                    old.seek(start)
+                    remaining = size
+                    while remaining > 0:
+                        chunk = old.read(min(remaining, COPY_CHUNK_SIZE))
+                        if not chunk:
+                            break
+                        chunk_hash.update(chunk)
+                        output_hash.update(chunk)
+                        output.write(chunk)
+                        remaining -= len(chunk)
+                    if remaining or chunk_hash.digest() != expected:
+                        raise ValueError(
+                            f"Original archive differs at {start:#x}, "
+                            "cannot apply patch"
+                        )
+                    written += size
+                elif kind == OP_DATA:
+                    require_patch_bytes(reader, 8)
+                    size = reader.read_unsigned_int_32_le()
+                    compressed_size = reader.read_unsigned_int_32_le()
+                    require_patch_bytes(reader, compressed_size)
+                    try:
+                        chunk = zlib.decompress(reader.read_bytes(compressed_size))
+                    except zlib.error as e:
+                        raise ValueError("Corrupted patch data") from e
+                    if len(chunk) != size:
+                        raise ValueError("Corrupted patch data")
+                    output_hash.update(chunk)
+                    output.write(chunk)
+                    written += size
+                else:
+                    raise ValueError(f"Unknown patch operation {kind}")
+        if written != new_size or output_hash.digest() != new_hash:
+            raise ValueError("Patched archive does not match the expected result")
+        os.chmod(temp_path, stat.S_IMODE(os.stat(old_path).st_mode))
+        os.replace(temp_path, output_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    diff_parser = subparsers.add_parser("diff", help="Create a patch between archives")
+    diff_parser.add_argument("old")
+    diff_parser.add_argument("new")
+    diff_parser.add_argument("patch")
+    apply_parser = subparsers.add_parser("apply", help="Apply a patch to an archive")
+    apply_parser.add_argument("old")
+    apply_parser.add_argument("patch")
+    apply_parser.add_argument("output")
+    args = parser.parse_args()
+
+    if args.command == "diff":
+        with open(args.old, "rb") as f:
+            old = f.read()
+        with open(args.new, "rb") as f:
+            new = f.read()
+        patch = diff_fga(old, new)
+        with open(args.patch, "wb") as f:
+            f.write(patch.bytes)
+        print(f"Done! Your patch is saved as {args.patch}")
+    else:
+        with open(args.patch, "rb") as f:
+            patch = f.read()
+        apply_fga(args.old, patch, args.output)
+        print(f"Done! Your patched archive is saved as {args.output}")
@@ -0,0 +1,38 @@
+import os
+from collections.abc import Mapping
+from typing import Any, TypeVar
+
+T = TypeVar("T", bound=Mapping[str, Any])
+
+
+def read_order(path: str) -> list[str]:
+    order = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            name = os.path.basename(line.replace("\\", "/"))
+            if name:
+                order.append(name)
+    return order
+
+
+def order_files(files: list[T], order: list[str]) -> list[T]:
+    rank: dict[str, int] = {}
+    for name in order:
+        rank.setdefault(name.casefold(), len(rank))
+    packed = {file["name"].casefold() for file in files}
+    unmatched = [
+        name for name in dict.fromkeys(order) if name.casefold() not in packed
+    ]
+    if unmatched:
+        print(f"Entries in the order list not found: {', '.join(unmatched)}")
+    return sorted(
+        files,
+        key=lambda file: (rank.get(file["name"].casefold(), len(rank)), file["name"]),
+    )
+
+
+def align_offset(offset: int, alignment: int) -> int:
+    return (offset + alignment - 1) // alignment * alignment
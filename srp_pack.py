@@ -1,11 +1,12 @@
+import argparse
 import os
-import sys
 from io import BytesIO
 from typing import TypedDict
 
 from rich.progress import track
 
 from binary import BinaryReader, BinaryWriter
+from layout import align_offset, order_files, read_order
 
 
 class BitTreeEncoder:
@@ -147,25 +148,30 @@ def split_array(array: list[File], size: int) -> list[list[File]]:
     return [array[i : i + size] for i in range(0, len(array), size)]
 
 
-def pack_fga(files: list[File]) -> bytes:
+def pack_fga(files: list[File], alignment: int = 1) -> bytes:
+    if alignment < 1:
+        raise ValueError(f"Invalid alignment {alignment}")
     fga = BinaryWriter()
     offset = 0x318
     splited_files = split_array(files, 32)
     for grouped_files_index, grouped_files in track(
         enumerate(splited_files), description="Packing files", total=len(splited_files)
     ):
+        offsets = []
         for file in grouped_files:
+            offset = align_offset(offset, alignment)
+            offsets.append(offset)
+            offset += len(file["data"])
+        for file, file_offset in zip(grouped_files, offsets):
             name = file["name"].encode("shift-jis")
             if len(name) > 12:
                 raise ValueError(f"File name {file['name']} is too long")
             fga.write_bytes(name)
             if len(name) < 12:
                 fga.write_bytes(b"\0" * (12 - len(name)))
-            data_len = len(file["data"])
-            fga.write_unsigned_int_32_le(offset)
-            fga.write_unsigned_int_32_le(data_len)
+            fga.write_unsigned_int_32_le(file_offset)
+            fga.write_unsigned_int_32_le(len(file["data"]))
             fga.write_bytes(b"\0" * 4)
-            offset += data_len
         if len(grouped_files) < 32:
             for _ in range(32 - len(grouped_files)):
                 fga.write_bytes(b"\x00" * 12)
@@ -182,7 +188,8 @@ def pack_fga(files: list[File]) -> bytes:
             fga.write_unsigned_int_32_le(offset)
             fga.write_unsigned_int_32_le(0)
             fga.write_bytes(b"\0" * 4)
-        for file in grouped_files:
+        for file, file_offset in zip(grouped_files, offsets):
+            fga.write_bytes(b"\0" * (file_offset - len(fga.data)))
             fga.write_bytes(file["data"])
         offset += 0x318
     return fga.data
@@ -193,20 +200,36 @@ def make_txt_to_srp(file: bytes) -> bytes:
     return huff.encode(file)
 
 
-def pack_srp(folder_path: str) -> bytes:
+def pack_srp(
+    folder_path: str, order: list[str] | None = None, alignment: int = 1
+) -> bytes:
     files = []
     print("This may take a while, please wait...")
-    for file in track(os.listdir(folder_path), description="Reading files"):
+    for file in track(sorted(os.listdir(folder_path)), description="Reading files"):
         if file.endswith(".SRP.txt"):
             file_name = file[:-4]
             print(f"Packing {file_name}...")
             with open(os.path.join(folder_path, file), "rb") as f:
                 files.append({"name": file_name, "data": make_txt_to_srp(f.read())})
-    return pack_fga(files)
+    if order:
+        files = order_files(files, order)
+    return pack_fga(files, alignment)
 
 
 if __name__ == "__main__":
-    srp = pack_srp(sys.argv[1])
+    parser = argparse.ArgumentParser()
+    parser.add_argument("folder")
+    parser.add_argument(
+        "--order", help="Load-order trace or manifest, one entry name per line"
+    )
+    parser.add_argument(
+        "--align", type=int, default=1, help="Align entry payloads to N bytes"
+    )
+    args = parser.parse_args()
+    if args.align < 1:
+        parser.error("--align must be at least 1")
+    order = read_order(args.order) if args.order else None
+    srp = pack_srp(args.folder, order, args.align)
     with open("packed_srp.fga", "wb") as f:
         f.write(srp)
     print("Done! Your packed SRP is saved as packed_srp.fga")